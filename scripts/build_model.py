@@ -0,0 +1,56 @@
+"""
+Export the default sentence-transformer model to an INT8-quantized ONNX
+artifact that semanticjson/compare.py loads with `--backend onnx`.
+
+Requires `optimum[onnxruntime]`. Run once from the repository root:
+
+    python scripts/build_model.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from sentence_transformers import SentenceTransformer  # noqa: E402
+from sentence_transformers.backend import export_dynamic_quantized_onnx_model  # noqa: E402
+from semanticjson.compare import DEFAULT_MODEL_NAME, LOCAL_ONNX_MODEL_DIR  # noqa: E402
+
+
+def build_model(output_dir, quantization):
+    """
+    Export the model to ONNX, then save a dynamically INT8-quantized variant alongside it.
+    """
+    # Loading with the ONNX backend exports the PyTorch weights to ONNX
+    model = SentenceTransformer(DEFAULT_MODEL_NAME, backend="onnx")
+    model.save(output_dir)
+
+    # Fixed suffix so compare.py finds the file whatever the target instruction set
+    export_dynamic_quantized_onnx_model(model, quantization, output_dir, file_suffix="qint8")
+
+
+def main():
+    """
+    Build the ONNX model artifact.
+    """
+    parser = argparse.ArgumentParser(description="Export the default model to an INT8-quantized ONNX artifact.")
+    parser.add_argument(
+        "--output",
+        default=LOCAL_ONNX_MODEL_DIR,
+        help="Directory to write the model to."
+    )
+    parser.add_argument(
+        "--quantization",
+        choices=["arm64", "avx2", "avx512", "avx512_vnni"],
+        default="avx512_vnni",
+        help="Target CPU instruction set for INT8 quantization."
+    )
+    args = parser.parse_args()
+
+    build_model(args.output, args.quantization)
+    print(f"Model written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
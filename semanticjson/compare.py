@@ -4,87 +4,640 @@ by incorporating deep learning techniques to understand the meaning of text with
 """
 import json
 import argparse
+import functools
+import hashlib
+import importlib.util
+import logging
+import math
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+import numpy as np
 from deepdiff import DeepDiff
-from sentence_transformers import SentenceTransformer, util
-from colorama import Fore, Style
-from tabulate import tabulate
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def hybrid_json_compare(json1_path, json2_path, threshold=0.9):
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+DEFAULT_NUM_THREADS = 4
+
+# Value types whose string form is worth comparing semantically
+_SCALAR_TYPES = (str, int, float, bool)
+
+# Digit runs this long may be integers wider than 64 bits, which orjson parses as floats
+_WIDE_NUMBER = re.compile(rb"\d{19}")
+
+# Set once torch's thread pools have been sized, explicitly or by default
+_threads_configured = False
+
+# Thread count requested via --threads, applied when the model is first loaded
+_requested_threads = None
+
+
+def _configure_threads(num_threads):
+    """
+    Limit torch's CPU thread pools.
+
+    JSON diffs encode only a handful of short strings per call, so large
+    intra-op thread pools spend more time synchronizing than computing.
+    """
+    import torch  # pylint: disable=import-outside-toplevel
+
+    global _threads_configured  # pylint: disable=global-statement
+    _threads_configured = True
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Inter-op threads can only be set before torch starts parallel work
+        pass
+
+
+def _request_threads(num_threads):
+    """
+    Record a torch CPU thread count to apply once _get_model loads torch.
+    """
+    global _requested_threads  # pylint: disable=global-statement
+    _requested_threads = num_threads
+
+
+PRECISIONS = ["fp32", "fp16", "bf16"]
+BACKENDS = ["torch", "onnx", "openvino"]
+
+# Modules that must be importable for each non-default backend
+_BACKEND_REQUIREMENTS = {
+    "onnx": ("optimum", "onnxruntime"),
+    "openvino": ("optimum", "openvino"),
+}
+
+# Pre-optimized graph shipped with the default model on the Hugging Face Hub
+_ONNX_FILE_NAME = "onnx/model_O3.onnx"
+
+# Local INT8-quantized export of the default model, built by scripts/build_model.py
+LOCAL_ONNX_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "minilm_onnx")
+_LOCAL_ONNX_FILE_NAME = "onnx/model_qint8.onnx"
+
+
+def _loads(data):
+    """
+    Parse JSON bytes, using orjson when it is installed and gives the same result as json.loads.
+
+    orjson turns integers wider than 64 bits into floats and rejects NaN,
+    Infinity and out-of-range numbers, so such documents go to the stdlib parser.
+    """
+    if orjson is None or _WIDE_NUMBER.search(data):
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _backend_available(backend):
+    """
+    Check whether the optional runtime for `backend` is installed.
+    """
+    return all(importlib.util.find_spec(module) for module in _BACKEND_REQUIREMENTS.get(backend, ()))
+
+
+def _device():
+    """
+    Device the model runs on: "cuda" when available, otherwise "cpu".
+    """
+    import torch  # pylint: disable=import-outside-toplevel
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_model(name=DEFAULT_MODEL_NAME, precision=None, backend="torch"):
+    """
+    Load the sentence-transformer model once and reuse it across calls.
+
+    `backend` selects the inference runtime: "onnx" (ONNX Runtime) or
+    "openvino" are typically several times faster than PyTorch on CPU.
+    If the runtime is not installed, the PyTorch backend is used instead.
+    For the default model, the ONNX backend prefers the local quantized
+    export from scripts/build_model.py when it exists, then the O3 graph
+    published on the Hub; other models are exported to ONNX on load.
+
+    On CUDA the PyTorch model runs in half precision unless `precision` says
+    otherwise; on CPU it stays in fp32. Reduced precision shifts similarity
+    scores by roughly 1e-3, well inside the default 0.9 threshold.
+    """
+    # Imported here so that structural-only comparisons never load torch
+    from sentence_transformers import SentenceTransformer  # pylint: disable=import-outside-toplevel
+
+    # Apply --threads, then respect an explicit OpenMP setting; otherwise default to a small pool
+    if not _threads_configured:
+        if _requested_threads:
+            _configure_threads(_requested_threads)
+        elif not os.environ.get("OMP_NUM_THREADS"):
+            _configure_threads(int(os.environ.get("SEMANTICJSON_THREADS", DEFAULT_NUM_THREADS)))
+
+    device = _device()
+
+    if backend != "torch" and not _backend_available(backend):
+        logging.warning("Backend '%s' is not installed, falling back to 'torch'.", backend)
+        backend = "torch"
+
+    if backend == "onnx" and name == DEFAULT_MODEL_NAME:
+        if os.path.exists(os.path.join(LOCAL_ONNX_MODEL_DIR, _LOCAL_ONNX_FILE_NAME)):
+            return SentenceTransformer(
+                LOCAL_ONNX_MODEL_DIR, device=device, backend="onnx", model_kwargs={"file_name": _LOCAL_ONNX_FILE_NAME}
+            )
+        return SentenceTransformer(name, device=device, backend="onnx", model_kwargs={"file_name": _ONNX_FILE_NAME})
+    if backend == "onnx":
+        # Other models may not ship an O3 graph; sentence-transformers exports them to ONNX on load
+        return SentenceTransformer(name, device=device, backend="onnx")
+    if backend == "openvino":
+        return SentenceTransformer(name, device=device, backend="openvino")
+
+    model = SentenceTransformer(name, device=device)
+    if device == "cuda":
+        if precision in (None, "fp16"):
+            model.half()
+        elif precision == "bf16":
+            model.bfloat16()
+    return model
+
+
+def _model_key(name=DEFAULT_MODEL_NAME, precision=None, backend="torch"):
+    """
+    Identify the embeddings that _get_model(name, precision, backend) produces.
+
+    Applies the same backend fallback, local ONNX export lookup and
+    effective precision as _get_model without loading the model, so
+    EmbeddingCache entries from different weights or numerics are never
+    mixed. The PyTorch backend imports torch to find the device.
+    """
+    if backend != "torch" and not _backend_available(backend):
+        backend = "torch"
+    if backend == "onnx" and name == DEFAULT_MODEL_NAME and os.path.exists(
+            os.path.join(LOCAL_ONNX_MODEL_DIR, _LOCAL_ONNX_FILE_NAME)):
+        return f"{name}|onnx|{_LOCAL_ONNX_FILE_NAME}"
+    if backend != "torch":
+        return f"{name}|{backend}"
+    # _get_model keeps CPU models in fp32 and defaults to fp16 on CUDA
+    if _device() == "cpu":
+        precision = "fp32"
+    return f"{name}|torch|{precision or 'fp16'}"
+
+
+class EmbeddingCache:
+    """
+    On-disk store of normalized embeddings, keyed by a model key from
+    _model_key and the SHA-256 of the text, so repeated runs only encode
+    strings they have not seen before.
+
+    The cache lives in `cache_dir`, defaulting to $SEMANTICJSON_CACHE_DIR or
+    ~/.cache/semanticjson.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.environ.get(
+            "SEMANTICJSON_CACHE_DIR", os.path.expanduser(os.path.join("~", ".cache", "semanticjson"))
+        )
+        self._conn = None
+
+    def __getstate__(self):
+        # Connections cannot be pickled; worker processes open their own
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.cache_dir, "embeddings.sqlite3"), timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, digest BLOB NOT NULL, embedding BLOB NOT NULL, "
+                "PRIMARY KEY (model, digest))"
+            )
+        return self._conn
+
+    @staticmethod
+    def _digest(text):
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, model_key, texts):
+        """
+        Return a dict mapping each text cached for `model_key` to its embedding; misses are omitted.
+        """
+        by_digest = {self._digest(text): text for text in texts}
+        digests = list(by_digest)
+        found = {}
+        conn = self._connection()
+        # Stay well below SQLite's limit on bound parameters per query
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            rows = conn.execute(
+                f"SELECT digest, embedding FROM embeddings WHERE model = ? AND digest IN ({','.join('?' * len(chunk))})",
+                [model_key, *chunk],
+            )
+            for digest, blob in rows:
+                found[by_digest[digest]] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, model_key, texts, embeddings):
+        """
+        Store one embedding per text for `model_key`.
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, embedding) VALUES (?, ?, ?)",
+                [
+                    (model_key, self._digest(text), np.asarray(embedding, dtype=np.float32).tobytes())
+                    for text, embedding in zip(texts, embeddings)
+                ],
+            )
+
+
+def _encode_unique(model, texts, batch_size):
+    """
+    Encode distinct strings into L2-normalized embeddings, one row per input.
+
+    Strings are sorted by approximate length and encoded in fixed-size buckets,
+    so each batch is padded only to the length of its own longest string.
+    """
+    order = np.argsort([len(text.split()) for text in texts], kind="stable")
+    sorted_texts = [texts[i] for i in order]
+
+    chunks = [
+        model.encode(
+            sorted_texts[start:start + batch_size],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        for start in range(0, len(sorted_texts), batch_size)
+    ]
+
+    # Undo the length sort so rows line up with texts again
+    return np.concatenate(chunks).astype(np.float32, copy=False)[np.argsort(order)]
+
+
+def _encode_texts(get_model, texts, batch_size=64, cache=None, model_key=None):
+    """
+    Encode a list of strings into L2-normalized embeddings, one row per input.
+
+    Each distinct string is encoded only once; repeated values reuse the same row.
+    With an EmbeddingCache, only strings missing from the cache under `model_key`
+    are encoded, and `get_model` is not called at all when every string is a cache hit.
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    embedding_map = cache.get_many(model_key, unique_texts) if cache is not None else {}
+
+    misses = [text for text in unique_texts if text not in embedding_map]
+    if misses:
+        miss_embeddings = _encode_unique(get_model(), misses, batch_size)
+        embedding_map.update(zip(misses, miss_embeddings))
+        if cache is not None:
+            cache.set_many(model_key, misses, miss_embeddings)
+
+    return np.stack([embedding_map[text] for text in texts])
+
+
+def _file_digest(path):
+    """
+    SHA-256 digest of a file's contents, read in 1 MB chunks.
+    """
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").digest()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+        return digest.digest()
+
+
+def _files_identical(json1_path, json2_path):
+    """
+    Check whether two files have byte-identical contents without parsing them.
+    """
+    if os.path.samefile(json1_path, json2_path):
+        return True
+    if os.path.getsize(json1_path) != os.path.getsize(json2_path):
+        return False
+    return _file_digest(json1_path) == _file_digest(json2_path)
+
+
+def _string_pairs(structural_diff):
+    """
+    Collect (old, new) pairs from a DeepDiff result that can be compared as text.
+
+    Yields (categories, path, old_value, new_value, old_text, new_text), where
+    `categories` lists the DeepDiff entries to drop if the pair is equivalent:
+
+    - values_changed where both sides are strings
+    - type_changes between scalars where at least one side is a string (e.g. "1" -> 1)
+    - iterable_item_removed/iterable_item_added string items at the same path
+    """
+    _str = str
+    for path, changes in structural_diff.get("values_changed", {}).items():
+        old_val = changes.get("old_value")
+        new_val = changes.get("new_value")
+        if isinstance(old_val, _str) and isinstance(new_val, _str):
+            yield ("values_changed",), path, old_val, new_val, old_val, new_val
+
+    for path, changes in structural_diff.get("type_changes", {}).items():
+        old_val = changes.get("old_value")
+        new_val = changes.get("new_value")
+        if (isinstance(old_val, _SCALAR_TYPES) and isinstance(new_val, _SCALAR_TYPES)
+                and (isinstance(old_val, _str) or isinstance(new_val, _str))):
+            yield ("type_changes",), path, old_val, new_val, _str(old_val), _str(new_val)
+
+    added = structural_diff.get("iterable_item_added", {})
+    for path, old_val in structural_diff.get("iterable_item_removed", {}).items():
+        new_val = added.get(path)
+        if isinstance(old_val, _str) and isinstance(new_val, _str):
+            yield ("iterable_item_removed", "iterable_item_added"), path, old_val, new_val, old_val, new_val
+
+
+class CompareOptions(NamedTuple):
+    """
+    Settings for hybrid_json_compare and compare_pairs beyond the files and threshold.
+
+    `model_name`, `precision` and `backend` select the encoder loaded by
+    _get_model. Strings longer than `max_len` characters are left as
+    structural differences. `deepdiff_kwargs` are forwarded to DeepDiff, and
+    `cache` is an optional EmbeddingCache shared across calls and processes.
+    """
+    model_name: str = DEFAULT_MODEL_NAME
+    precision: Optional[str] = None
+    backend: str = "torch"
+    max_len: Optional[int] = None
+    deepdiff_kwargs: Optional[dict] = None
+    cache: Optional[EmbeddingCache] = None
+
+
+def _read_json(path):
+    """
+    Parse a JSON file, reading raw bytes so the faster orjson parser can be used when installed.
+    """
+    with open(path, "rb") as f:
+        return _loads(f.read())
+
+
+def _split_string_pairs(structural_diff, max_len):
+    """
+    Split the string pairs of a DeepDiff result into those scored without the
+    model and those that need encoding.
+
+    Returns (scored, to_encode): `scored` holds (categories, path, old_value,
+    new_value, similarity) entries and `to_encode` holds _string_pairs tuples.
+    """
+    scored = []
+    to_encode = []
+    for pair in _string_pairs(structural_diff):
+        *entry, old_text, new_text = pair
+        old_key = old_text.strip().casefold()
+        new_key = new_text.strip().casefold()
+        if old_key == new_key:
+            # Whitespace/case noise only, no need to run the model
+            scored.append((*entry, 1.0))
+        elif not old_key or not new_key:
+            # Nothing to compare meaningfully; keep as a structural difference
+            continue
+        elif max_len is not None and max(len(old_text), len(new_text)) > max_len:
+            # Embeddings of huge blobs are meaningless; keep as a structural difference
+            continue
+        else:
+            to_encode.append(pair)
+    return scored, to_encode
+
+
+def _score_with_model(to_encode, model, options):
+    """
+    Score _string_pairs tuples by the cosine similarity of their embeddings.
+    """
+    def get_model():
+        # Reuse the shared sentence-transformer model unless one was injected
+        if model is not None:
+            return model
+        return _get_model(options.model_name, precision=options.precision, backend=options.backend)
+
+    # Encode every distinct old/new string in a single batched call
+    texts = [text for *_, old_text, new_text in to_encode for text in (old_text, new_text)]
+    model_key = None
+    if options.cache is not None:
+        model_key = _model_key(options.model_name, precision=options.precision, backend=options.backend)
+    embeddings = _encode_texts(get_model, texts, cache=options.cache, model_key=model_key)
+    # Embeddings are L2-normalized, so cosine similarity is a row-wise dot product
+    similarities = np.einsum("ij,ij->i", embeddings[0::2], embeddings[1::2]).tolist()
+    return [
+        (categories, path, old_val, new_val, similarity)
+        for (categories, path, old_val, new_val, _, _), similarity in zip(to_encode, similarities)
+    ]
+
+
+def _apply_scores(structural_diff, scored, threshold):
+    """
+    Build semantic_diff from scored pairs, removing equivalent ones from structural_diff.
+    """
+    # Dictionary to store our semantic analysis
+    # Key: path (e.g., "root['my_field']"), Value: dict with "similarity", "status", etc.
+    semantic_diff = {}
+
+    # (category, path) entries to drop from structural_diff, removed after the loop
+    to_delete = []
+    for categories, path, old_val, new_val, similarity in scored:
+        # If above threshold, remove from structural_diff and note as equivalent
+        if similarity >= threshold:
+            to_delete.extend((category, path) for category in categories)
+            semantic_diff[path] = {
+                "status": "Equivalent (semantically)",
+                "similarity": similarity,
+                "old_value": old_val,
+                "new_value": new_val,
+            }
+        else:
+            semantic_diff[path] = {
+                "status": "Changed (semantically different)",
+                "similarity": similarity,
+                "old_value": old_val,
+                "new_value": new_val,
+            }
+
+    for category, path in to_delete:
+        del structural_diff[category][path]
+        # If a category became empty, remove it from structural_diff
+        if not structural_diff[category]:
+            del structural_diff[category]
+
+    return semantic_diff
+
+
+def hybrid_json_compare(json1_path, json2_path, threshold=0.9, model=None, options=None):
     """
     Compares two JSON files using a hybrid approach: structural (DeepDiff)
     and a semantic check (sentence-transformers).
 
     1. Uses DeepDiff to identify which fields changed (structural_diff).
     2. For each changed field that is a string, calculates semantic similarity.
+       This covers values_changed, string/scalar type_changes, and list items
+       removed and added at the same path.
     3. If similarity >= threshold, removes that entry from structural_diff
        and marks it as "Equivalent" in semantic_diff.
     4. Otherwise, flags it as "Changed" in semantic_diff.
+
+    Pairs that differ only in surrounding whitespace or case are marked
+    equivalent without running the model. Other pairs where one side is
+    blank, or either side is longer than `options.max_len` characters, are
+    left as structural differences.
+
+    A pre-loaded SentenceTransformer can be passed as `model`; otherwise a
+    shared module-level instance is loaded as described by `options`, a
+    CompareOptions. The model is only loaded when a string change actually
+    needs scoring, so purely structural diffs never import torch.
+
+    With `options.cache`, embeddings are reused across calls and processes.
+    They are keyed by the model name, backend and precision in `options`, so
+    an injected `model` should match those settings.
+
+    `options.deepdiff_kwargs` are forwarded to DeepDiff, e.g. `{"max_diffs": 100}`
+    to stop walking the tree after a bounded number of differences. DeepDiff
+    may then report fewer differences than the limit, or none at all, so
+    the result's "truncated" flag is set whenever the limit was reached.
     """
+    options = options or CompareOptions()
+
+    # Byte-identical files cannot differ, so skip parsing and diffing entirely
+    if _files_identical(json1_path, json2_path):
+        return {
+            "structural_diff": {},
+            "semantic_diff": {},
+            "truncated": False
+        }
 
-    with open(json1_path, "r", encoding="utf-8") as f1, open(json2_path, "r", encoding="utf-8") as f2:
-        json1 = json.load(f1)
-        json2 = json.load(f2)
+    json1 = _read_json(json1_path)
+    json2 = _read_json(json2_path)
 
     # Structural comparison
-    structural_diff = DeepDiff(json1, json2)
+    structural_diff = DeepDiff(json1, json2, **(options.deepdiff_kwargs or {}))
+    truncated = structural_diff.get_stats()["MAX DIFF LIMIT REACHED"]
 
-    # Initialize sentence-transformer model
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    # Similarity per path, either trivially known or computed by the model
+    scored, to_encode = _split_string_pairs(structural_diff, options.max_len)
+    if to_encode:
+        scored.extend(_score_with_model(to_encode, model, options))
 
-    # Dictionary to store our semantic analysis
-    # Key: path (e.g., "root['my_field']"), Value: dict with "similarity", "status", etc.
-    semantic_diff = {}
-
-    # If there are changes in values_changed, evaluate them semantically
-    if "values_changed" in structural_diff:
-        for path, changes in list(structural_diff["values_changed"].items()):
-            old_val = changes.get("old_value")
-            new_val = changes.get("new_value")
-
-            # Only if both old and new values are strings
-            if isinstance(old_val, str) and isinstance(new_val, str):
-                embedding1 = model.encode(old_val, convert_to_tensor=True)
-                embedding2 = model.encode(new_val, convert_to_tensor=True)
-                similarity = util.pytorch_cos_sim(embedding1, embedding2).item()
-
-                # If above threshold, remove from structural_diff and note as equivalent
-                if similarity >= threshold:
-                    del structural_diff["values_changed"][path]
-                    semantic_diff[path] = {
-                        "status": "Equivalent (semantically)",
-                        "similarity": similarity,
-                        "old_value": old_val,
-                        "new_value": new_val,
-                    }
-                else:
-                    semantic_diff[path] = {
-                        "status": "Changed (semantically different)",
-                        "similarity": similarity,
-                        "old_value": old_val,
-                        "new_value": new_val,
-                    }
-
-        # If "values_changed" became empty, remove it from structural_diff
-        if not structural_diff["values_changed"]:
-            del structural_diff["values_changed"]
+    semantic_diff = _apply_scores(structural_diff, scored, threshold)
 
     return {
         "structural_diff": structural_diff,
-        "semantic_diff": semantic_diff
+        "semantic_diff": semantic_diff,
+        "truncated": truncated
     }
 
 
+def _compare_pair(json1_path, json2_path, threshold, options):
+    """
+    Run hybrid_json_compare in a worker process.
+    """
+    results = hybrid_json_compare(json1_path, json2_path, threshold=threshold, options=options)
+    # DeepDiff keeps references to both parsed documents; return only the plain result dict
+    results["structural_diff"] = dict(results["structural_diff"])
+    return results
+
+
+def compare_pairs(pairs, threshold=0.9, workers=None, options=None):
+    """
+    Compare many (json1_path, json2_path) pairs in parallel worker processes.
+
+    Each worker loads the model described by `options`, a CompareOptions,
+    the first time one of its pairs needs scoring, and reuses it for the
+    rest; workers that only see structural differences never load it.
+    Each worker uses a single torch thread so that parallel workers do not
+    oversubscribe the CPU.
+    Returns a list of hybrid_json_compare results in the same order as `pairs`.
+    """
+    options = options or CompareOptions()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_request_threads, initargs=(1,)) as executor:
+        futures = [
+            executor.submit(_compare_pair, json1_path, json2_path, threshold, options)
+            for json1_path, json2_path in pairs
+        ]
+        return [future.result() for future in futures]
+
+
+def _read_pairs(pairs_path):
+    """
+    Read tab-separated JSON file pairs, one pair per line. Blank lines are ignored.
+    """
+    pairs = []
+    with open(pairs_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            fields = line.rstrip("\r\n").split("\t")
+            if len(fields) != 2:
+                raise ValueError(f"{pairs_path}:{line_number}: expected two tab-separated paths")
+            pairs.append((fields[0], fields[1]))
+    return pairs
+
+
+def _has_non_finite(obj):
+    """
+    Check whether `obj` holds a NaN or infinite float, which orjson would print as null.
+    """
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
+
+
+def _print_json(obj):
+    """
+    Print `obj` as indented JSON, using orjson when available.
+
+    Values JSON cannot represent (DeepDiff sets, type objects) are printed via str().
+    NaN and infinities are printed as json.dumps does, whichever encoder is used.
+    """
+    if orjson is None or _has_non_finite(obj):
+        print(json.dumps(obj, indent=2, default=str))
+        return
+    try:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str)
+    except TypeError:
+        # orjson.JSONEncodeError, e.g. for integers wider than 64 bits, which json.dumps prints exactly
+        print(json.dumps(obj, indent=2, default=str))
+        return
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        # Text-only streams, e.g. io.StringIO under contextlib.redirect_stdout
+        print(data.decode())
+        return
+    # Flush pending text output so it stays ordered with the raw bytes written below
+    sys.stdout.flush()
+    buffer.write(data)
+    buffer.write(b"\n")
+    buffer.flush()
+
+
 def color_print_diffs(differences):
     """
     Pretty print differences with color highlights.
     """
+    from colorama import Fore, Style  # pylint: disable=import-outside-toplevel
+
     # Structural differences
     print(Fore.CYAN + "Structural Differences:" + Style.RESET_ALL)
     if not differences["structural_diff"]:
         print(Fore.GREEN + "  None" + Style.RESET_ALL)
     else:
-        print(json.dumps(differences["structural_diff"], indent=2))
+        _print_json(differences["structural_diff"])
 
     # Semantic differences
     print(Fore.CYAN + "\nSemantic Differences:" + Style.RESET_ALL)
@@ -106,6 +659,9 @@ def color_print_diffs(differences):
             print("    Old:", old_value)
             print("    New:", new_value)
 
+    if differences.get("truncated"):
+        print(Fore.YELLOW + "\nStopped at the max_diffs limit; more differences may exist." + Style.RESET_ALL)
+
 
 def table_print_diffs(differences):
     """
@@ -115,39 +671,53 @@ def table_print_diffs(differences):
     This version skips printing a separate structural row
     for paths that also have semantic differences.
     """
+    from tabulate import tabulate  # pylint: disable=import-outside-toplevel
+
     structural_diff = differences.get("structural_diff", {})
     semantic_diff = differences.get("semantic_diff", {})
 
-    table_data = [
-        ["Path", "Old Value", "New Value", "Similarity", "Status"]
-    ]
+    header = ["Path", "Old Value", "New Value", "Similarity", "Status"]
+    fmt = "{:.2f}".format
 
-    # 1. Print structural diffs only if they are not in the semantic diff
-    if "values_changed" in structural_diff:
-        for path, change_info in structural_diff["values_changed"].items():
-            if path in semantic_diff:
-                # Skip, because we'll show it in semantic section
-                continue
-            old_val = change_info.get("old_value", "")
-            new_val = change_info.get("new_value", "")
-            table_data.append([path, old_val, new_val, "-", "Structural difference"])
+    # 1. Structural diffs, skipping paths shown in the semantic section
+    struct_rows = [
+        [path, change_info.get("old_value", ""), change_info.get("new_value", ""), "-", "Structural difference"]
+        for path, change_info in structural_diff.get("values_changed", {}).items()
+        if path not in semantic_diff
+    ]
 
-    # 2. Print semantic diffs
+    # 2. Semantic diffs
     #    (includes both "Equivalent" and "Changed" entries)
-    for path, info in semantic_diff.items():
-        old_val = info.get("old_value", "")
-        new_val = info.get("new_value", "")
-        similarity = f"{info['similarity']:.2f}"
-        status = info["status"]
-        table_data.append([path, old_val, new_val, similarity, status])
-
-    # 3. If no rows beyond header, print a "no differences" entry
-    if len(table_data) == 1:
+    sem_rows = [
+        [path, info.get("old_value", ""), info.get("new_value", ""), fmt(info["similarity"]), info["status"]]
+        for path, info in semantic_diff.items()
+    ]
+
+    table_data = [header] + struct_rows + sem_rows
+
+    # 3. Flag a comparison cut short by max_diffs; otherwise, if no rows
+    #    beyond header, print a "no differences" entry
+    if differences.get("truncated"):
+        table_data.append(["-", "-", "-", "-", "Stopped at max_diffs; more differences may exist"])
+    elif len(table_data) == 1:
         table_data.append(["None", "-", "-", "-", "No differences found"])
 
     print(tabulate(table_data, headers="firstrow", tablefmt="simple"))
 
 
+def _print_results(results, output_format):
+    """
+    Print a single comparison result in the requested output format.
+    """
+    if output_format == "color" or output_format == "colour":
+        color_print_diffs(results)
+    elif output_format == "table":
+        table_print_diffs(results)
+    else:
+        # Raw JSON output
+        _print_json(results)
+
+
 def main():
     """
     Compare two JSON files using DeepDiff and sentence-transformers.
@@ -155,8 +725,18 @@ def main():
     parser = argparse.ArgumentParser(
         description="Compare two JSON files using DeepDiff and sentence-transformers."
     )
-    parser.add_argument("json1", help="Path to the first JSON file.")
-    parser.add_argument("json2", help="Path to the second JSON file.")
+    parser.add_argument("json1", nargs="?", help="Path to the first JSON file.")
+    parser.add_argument("json2", nargs="?", help="Path to the second JSON file.")
+    parser.add_argument(
+        "--pairs",
+        help="File listing JSON file pairs to compare in parallel, one tab-separated pair per line."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for --pairs (default: number of CPUs)."
+    )
     parser.add_argument(
         "--format",
         choices=["color", "colour", "table", "raw"],
@@ -169,17 +749,97 @@ def main():
         default=0.9,
         help="Similarity threshold above which differences are considered 'semantically equivalent'."
     )
+    parser.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default=None,
+        help="Model precision on CUDA (default: fp16). CPU always uses fp32."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="torch",
+        help="Inference runtime for the encoder. Falls back to torch if the runtime is not installed."
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help=f"Number of torch CPU threads (default: $SEMANTICJSON_THREADS or {DEFAULT_NUM_THREADS}). "
+             "Not allowed with --pairs, where each worker uses one thread."
+    )
+    parser.add_argument(
+        "--max-diffs",
+        type=int,
+        default=None,
+        help="Limit on differences DeepDiff collects before it stops. DeepDiff may then report fewer "
+             "differences, or none; the output is marked truncated when the limit is reached."
+    )
+    parser.add_argument(
+        "--ignore-string-type-changes",
+        action="store_true",
+        help="Treat str and bytes values with the same content as equal."
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Reuse embeddings across runs via an on-disk cache in $SEMANTICJSON_CACHE_DIR "
+             "(default: ~/.cache/semanticjson)."
+    )
     args = parser.parse_args()
 
-    results = hybrid_json_compare(args.json1, args.json2, threshold=args.threshold)
+    if args.pairs is None and (args.json1 is None or args.json2 is None):
+        parser.error("json1 and json2 are required unless --pairs is given.")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.pairs is not None and args.threads:
+        parser.error("--threads cannot be used with --pairs; each worker uses one torch thread.")
 
-    if args.format == "color" or args.format == "colour":
-        color_print_diffs(results)
-    elif args.format == "table":
-        table_print_diffs(results)
-    else:
-        # Raw JSON output
-        print(json.dumps(results, indent=2))
+    deepdiff_kwargs = {}
+    if args.max_diffs is not None:
+        deepdiff_kwargs["max_diffs"] = args.max_diffs
+    if args.ignore_string_type_changes:
+        deepdiff_kwargs["ignore_string_type_changes"] = True
+
+    options = CompareOptions(
+        precision=args.precision,
+        backend=args.backend,
+        deepdiff_kwargs=deepdiff_kwargs,
+        cache=EmbeddingCache() if args.cache else None,
+    )
+
+    if args.pairs:
+        try:
+            pairs = _read_pairs(args.pairs)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        all_results = compare_pairs(
+            pairs,
+            threshold=args.threshold,
+            workers=args.workers,
+            options=options,
+        )
+        if args.format == "raw":
+            _print_json(
+                [{"json1": json1, "json2": json2, **results} for (json1, json2), results in zip(pairs, all_results)]
+            )
+        else:
+            for (json1, json2), results in zip(pairs, all_results):
+                print(f"\n=== {json1} vs {json2} ===")
+                _print_results(results, args.format)
+        return
+
+    if args.threads:
+        _request_threads(args.threads)
+
+    results = hybrid_json_compare(
+        args.json1,
+        args.json2,
+        threshold=args.threshold,
+        options=options,
+    )
+    _print_results(results, args.format)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,67 @@
 """
 tests/test_compare.py
 """
+import contextlib
+import io
 import unittest
 import os
-from semanticjson.compare import hybrid_json_compare
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+from semanticjson.compare import (
+    CompareOptions, EmbeddingCache, compare_pairs, hybrid_json_compare, color_print_diffs, main,
+    _encode_unique, _files_identical, _get_model, _print_results, _read_pairs
+)
+
+
+def _write_json(directory, name, text):
+    """
+    Write `text` to `name` inside `directory` and return the file path.
+    """
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+class _StubModel:  # pylint: disable=too-few-public-methods
+    """
+    Stand-in for SentenceTransformer that records its encode calls.
+
+    Texts with the same letters and digits, ignoring case, get the same unit
+    vector (similarity 1.0); all other texts get orthogonal ones (similarity 0.0).
+    """
+    def __init__(self):
+        self.calls = []
+        self._dims = {}
+
+    def embedding(self, text):
+        """
+        Return the normalized embedding of a single text.
+        """
+        key = "".join(ch for ch in text.casefold() if ch.isalnum())
+        row = np.zeros(64, dtype=np.float32)
+        row[self._dims.setdefault(key, len(self._dims))] = 1.0
+        return row
+
+    def encode(self, texts, **_kwargs):
+        """
+        Return one normalized embedding row per text.
+        """
+        self.calls.append(list(texts))
+        return np.stack([self.embedding(text) for text in texts])
 
 
 class TestHybridJsonCompare(unittest.TestCase):
     """
     Unit tests for the hybrid_json_compare function in semanticjson/compare.py.
     """
+    @classmethod
+    def setUpClass(cls):
+        # Load the model once and share it across test methods
+        cls.model = _get_model()
+
     def test_compare_files(self):
         """
         Unit test comparing two known JSON files (file1.json and file2.json)
@@ -18,7 +70,7 @@ class TestHybridJsonCompare(unittest.TestCase):
         file1 = os.path.join("tests", "test_data", "file1.json")
         file2 = os.path.join("tests", "test_data", "file2.json")
 
-        results = hybrid_json_compare(file1, file2)
+        results = hybrid_json_compare(file1, file2, model=self.model)
         self.assertIn("structural_diff", results, "Results should contain 'structural_diff'.")
         self.assertIn("semantic_diff", results, "Results should contain 'semantic_diff'.")
 
@@ -38,5 +90,419 @@ class TestHybridJsonCompare(unittest.TestCase):
         self.assertEqual(results["semantic_diff"], {}, "Expected no semantic differences for these test files.")
 
 
+class TestIdenticalFiles(unittest.TestCase):
+    """
+    Byte-identical files are reported equal without parsing or diffing them.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_compare_identical_files(self):
+        """
+        A copy of a file at another path short-circuits before parsing and DeepDiff.
+        """
+        file1 = os.path.join("tests", "test_data", "file1.json")
+        file2 = os.path.join(self.tmp_dir.name, "copy.json")
+        shutil.copyfile(file1, file2)
+
+        with mock.patch("semanticjson.compare._loads", side_effect=AssertionError("parsed")), \
+                mock.patch("semanticjson.compare.DeepDiff", side_effect=AssertionError("diffed")):
+            results = hybrid_json_compare(file1, file2, model=_StubModel())
+        self.assertEqual(results["structural_diff"], {}, "Expected no structural differences for identical files.")
+        self.assertEqual(results["semantic_diff"], {}, "Expected no semantic differences for identical files.")
+
+    def test_same_size_different_bytes(self):
+        """
+        Files of equal size but different contents are not identical.
+        """
+        file1 = _write_json(self.tmp_dir.name, "a.json", '{"a": 1}')
+        file2 = _write_json(self.tmp_dir.name, "b.json", '{"a": 2}')
+
+        self.assertFalse(_files_identical(file1, file2))
+        self.assertTrue(_files_identical(file1, file1))
+
+
+class TestJsonParsing(unittest.TestCase):
+    """
+    Parsing must give the same answers as json.load whether or not orjson is installed.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_wide_integers_are_compared_exactly(self):
+        """
+        Integers wider than 64 bits that differ only in the last digit are reported as changed.
+        """
+        file1 = _write_json(self.tmp_dir.name, "a.json", '{"id": 12345678901234567890123}')
+        file2 = _write_json(self.tmp_dir.name, "b.json", '{"id": 12345678901234567890124}')
+
+        results = hybrid_json_compare(file1, file2)
+        changed = results["structural_diff"]["values_changed"]["root['id']"]
+        self.assertEqual(changed["old_value"], 12345678901234567890123)
+        self.assertEqual(changed["new_value"], 12345678901234567890124)
+
+    def test_non_finite_numbers_are_accepted(self):
+        """
+        NaN, Infinity and out-of-range numbers, which json.load accepts, still parse.
+        """
+        file1 = _write_json(self.tmp_dir.name, "a.json", '{"a": NaN, "b": Infinity, "c": 1e400, "d": 1}')
+        file2 = _write_json(self.tmp_dir.name, "b.json", '{"a": NaN, "b": Infinity, "c": 1e400, "d": 2}')
+
+        results = hybrid_json_compare(file1, file2)
+        self.assertEqual(list(results["structural_diff"]["values_changed"]), ["root['d']"])
+
+
+class TestMaxDiffs(unittest.TestCase):
+    """
+    Comparisons cut short by DeepDiff's max_diffs must say so.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file1 = _write_json(self.tmp_dir.name, "a.json", '{"a": 1, "b": 2}')
+        self.file2 = _write_json(self.tmp_dir.name, "b.json", '{"a": 3, "b": 4}')
+
+    def test_max_diffs_marks_result_truncated(self):
+        """
+        Reaching the limit sets "truncated", even when DeepDiff reports no differences.
+        """
+        results = hybrid_json_compare(self.file1, self.file2, options=CompareOptions(deepdiff_kwargs={"max_diffs": 1}))
+        self.assertTrue(results["truncated"], "Expected the comparison to be marked truncated.")
+
+    def test_without_limit_result_is_not_truncated(self):
+        """
+        A full comparison reports every difference and is not marked truncated.
+        """
+        results = hybrid_json_compare(self.file1, self.file2)
+        self.assertFalse(results["truncated"])
+        self.assertEqual(len(results["structural_diff"]["values_changed"]), 2)
+
+
+class TestOutput(unittest.TestCase):
+    """
+    Printing must work on any stdout, including text-only streams.
+    """
+    def test_color_print_to_text_stream(self):
+        """
+        Structural differences print as JSON when stdout has no binary buffer.
+        """
+        differences = {
+            "structural_diff": {"values_changed": {"root['a']": {"old_value": 1, "new_value": 2}}},
+            "semantic_diff": {},
+        }
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            color_print_diffs(differences)
+        self.assertIn('"new_value": 2', output.getvalue())
+
+    def test_raw_output_prints_wide_integers(self):
+        """
+        Integers wider than 64 bits are printed exactly in raw output.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file1 = _write_json(tmp_dir, "a.json", '{"id": 12345678901234567890123}')
+            file2 = _write_json(tmp_dir, "b.json", '{"id": 12345678901234567890124}')
+            results = hybrid_json_compare(file1, file2)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            _print_results(results, "raw")
+        self.assertIn('"old_value": 12345678901234567890123', output.getvalue())
+        self.assertIn('"new_value": 12345678901234567890124', output.getvalue())
+
+    def test_raw_output_prints_non_finite_numbers(self):
+        """
+        NaN and infinities are printed as such rather than as null.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file1 = _write_json(tmp_dir, "a.json", '{"a": 1, "b": 1}')
+            file2 = _write_json(tmp_dir, "b.json", '{"a": NaN, "b": -Infinity}')
+            results = hybrid_json_compare(file1, file2)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            _print_results(results, "raw")
+        self.assertIn('"new_value": NaN', output.getvalue())
+        self.assertIn('"new_value": -Infinity', output.getvalue())
+
+
+class TestTrivialStringChanges(unittest.TestCase):
+    """
+    String changes whose outcome is known without embeddings never reach the model.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.model = _StubModel()
+
+    def _compare(self, text1, text2, options=None):
+        file1 = _write_json(self.tmp_dir.name, "a.json", text1)
+        file2 = _write_json(self.tmp_dir.name, "b.json", text2)
+        return hybrid_json_compare(file1, file2, model=self.model, options=options)
+
+    def test_blank_side_stays_structural(self):
+        """
+        A change from or to a blank string is left as a structural difference.
+        """
+        results = self._compare('{"name": "", "city": "Ottawa"}', '{"name": "LORETTA Inc", "city": "  "}')
+
+        self.assertEqual(set(results["structural_diff"]["values_changed"]), {"root['name']", "root['city']"})
+        self.assertEqual(results["semantic_diff"], {})
+        self.assertEqual(self.model.calls, [], "The model should not run for blank strings.")
+
+    def test_whitespace_and_case_changes_are_equivalent(self):
+        """
+        Changes only in surrounding whitespace or case are equivalent at similarity 1.0.
+        """
+        results = self._compare('{"name": "LORETTA Inc"}', '{"name": "  loretta inc\\n"}')
+
+        self.assertEqual(results["structural_diff"], {})
+        self.assertEqual(results["semantic_diff"]["root['name']"]["status"], "Equivalent (semantically)")
+        self.assertEqual(results["semantic_diff"]["root['name']"]["similarity"], 1.0)
+        self.assertEqual(self.model.calls, [], "The model should not run for whitespace/case-only changes.")
+
+    def test_blank_to_whitespace_is_equivalent(self):
+        """
+        Two strings that are both blank after stripping are equivalent, not structural.
+        """
+        results = self._compare('{"name": ""}', '{"name": "  "}')
+
+        self.assertEqual(results["structural_diff"], {})
+        self.assertEqual(results["semantic_diff"]["root['name']"]["status"], "Equivalent (semantically)")
+        self.assertEqual(results["semantic_diff"]["root['name']"]["similarity"], 1.0)
+        self.assertEqual(self.model.calls, [])
+
+    def test_oversized_strings_stay_structural(self):
+        """
+        Strings longer than max_len are left as structural differences.
+        """
+        results = self._compare('{"blob": "abcdef"}', '{"blob": "uvwxyz"}', CompareOptions(max_len=5))
+
+        self.assertIn("root['blob']", results["structural_diff"]["values_changed"])
+        self.assertEqual(results["semantic_diff"], {})
+        self.assertEqual(self.model.calls, [])
+
+
+class TestEncoding(unittest.TestCase):
+    """
+    Length-sorted batch encoding returns embeddings in input order.
+    """
+    def test_rows_follow_input_order(self):
+        """
+        Each row is the embedding of its own text, whatever order the batches ran in.
+        """
+        texts = ["four words right here", "one", "a much longer text with seven", "two words", "x y z", "six"]
+        model = _StubModel()
+
+        embeddings = _encode_unique(model, texts, batch_size=2)
+
+        self.assertEqual(len(model.calls), 3)
+        encoded = [text for call in model.calls for text in call]
+        self.assertEqual([len(text.split()) for text in encoded], sorted(len(text.split()) for text in texts))
+        for text, row in zip(texts, embeddings):
+            np.testing.assert_array_equal(row, model.embedding(text), err_msg=text)
+
+
+class TestNonStringValueChanges(unittest.TestCase):
+    """
+    Type changes and same-path list item swaps are scored like string value changes.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.model = _StubModel()
+
+    def _compare(self, text1, text2, deepdiff_kwargs=None):
+        file1 = _write_json(self.tmp_dir.name, "a.json", text1)
+        file2 = _write_json(self.tmp_dir.name, "b.json", text2)
+        return hybrid_json_compare(file1, file2, model=self.model, options=CompareOptions(deepdiff_kwargs=deepdiff_kwargs))
+
+    def test_type_change_resolves_to_equivalent(self):
+        """
+        A string and a scalar with the same text form are equivalent without the model.
+        """
+        results = self._compare('{"a": "1", "b": true}', '{"a": 1, "b": "TRUE"}')
+
+        self.assertNotIn("type_changes", results["structural_diff"])
+        for path in ("root['a']", "root['b']"):
+            self.assertEqual(results["semantic_diff"][path]["status"], "Equivalent (semantically)")
+            self.assertEqual(results["semantic_diff"][path]["similarity"], 1.0)
+        self.assertEqual(self.model.calls, [], "The model should not run for text-identical type changes.")
+
+    def test_type_change_scored_as_changed(self):
+        """
+        A type change whose text forms differ is scored by the model and stays structural.
+        """
+        results = self._compare('{"a": "yes"}', '{"a": 0}')
+
+        self.assertIn("root['a']", results["structural_diff"]["type_changes"])
+        self.assertEqual(results["semantic_diff"]["root['a']"]["status"], "Changed (semantically different)")
+        self.assertEqual(results["semantic_diff"]["root['a']"]["old_value"], "yes")
+        self.assertEqual(results["semantic_diff"]["root['a']"]["new_value"], 0)
+        self.assertEqual(self.model.calls, [["yes", "0"]])
+
+    def test_same_path_list_items_resolve_to_equivalent(self):
+        """
+        A list item removed and added at the same path is compared as a pair.
+        """
+        results = self._compare(
+            '{"t": ["Acme, Inc."]}', '{"t": ["acme inc"]}', {"ignore_order": True, "report_repetition": True}
+        )
+
+        self.assertEqual(results["structural_diff"], {})
+        self.assertEqual(results["semantic_diff"]["root['t'][0]"]["status"], "Equivalent (semantically)")
+
+    def test_equivalent_entries_are_removed_per_category(self):
+        """
+        Only equivalent entries are dropped; categories that still hold changes are kept.
+        """
+        results = self._compare(
+            '{"t": ["Acme, Inc.", "red"]}', '{"t": ["acme inc", "blue"]}', {"ignore_order": True, "report_repetition": True}
+        )
+
+        structural_diff = results["structural_diff"]
+        self.assertEqual(dict(structural_diff["iterable_item_removed"]), {"root['t'][1]": "red"})
+        self.assertEqual(dict(structural_diff["iterable_item_added"]), {"root['t'][1]": "blue"})
+        self.assertEqual(results["semantic_diff"]["root['t'][0]"]["status"], "Equivalent (semantically)")
+        self.assertEqual(results["semantic_diff"]["root['t'][1]"]["status"], "Changed (semantically different)")
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """
+    Embeddings are reused across runs, but only for the same model settings.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache = EmbeddingCache(cache_dir=os.path.join(self.tmp_dir.name, "cache"))
+        self.file1 = _write_json(self.tmp_dir.name, "a.json", '{"name": "Acme, Inc."}')
+        self.file2 = _write_json(self.tmp_dir.name, "b.json", '{"name": "acme inc"}')
+        # Resolve the device without importing torch
+        device_patcher = mock.patch("semanticjson.compare._device", return_value="cpu")
+        device_patcher.start()
+        self.addCleanup(device_patcher.stop)
+
+    def test_get_many_round_trips_set_many(self):
+        """
+        Stored embeddings come back unchanged, only for the key they were stored under.
+        """
+        embeddings = np.eye(2, 8, dtype=np.float32)
+        self.cache.set_many("model-a", ["first", "second"], embeddings)
+
+        found = self.cache.get_many("model-a", ["first", "second", "missing"])
+        self.assertEqual(set(found), {"first", "second"})
+        np.testing.assert_array_equal(found["first"], embeddings[0])
+        np.testing.assert_array_equal(found["second"], embeddings[1])
+        self.assertEqual(self.cache.get_many("model-b", ["first"]), {})
+
+    def test_model_skipped_when_every_string_is_cached(self):
+        """
+        A second run over the same strings is served entirely from the cache.
+        """
+        first_model = _StubModel()
+        first = hybrid_json_compare(self.file1, self.file2, model=first_model, options=CompareOptions(cache=self.cache))
+        self.assertEqual(len(first_model.calls), 1)
+
+        second_model = _StubModel()
+        second = hybrid_json_compare(self.file1, self.file2, model=second_model, options=CompareOptions(cache=self.cache))
+        self.assertEqual(second_model.calls, [], "Expected every string to be a cache hit.")
+        self.assertEqual(second["semantic_diff"], first["semantic_diff"])
+
+    def _encode_calls(self, device, precision=None):
+        model = _StubModel()
+        with mock.patch("semanticjson.compare._device", return_value=device):
+            hybrid_json_compare(
+                self.file1, self.file2, model=model, options=CompareOptions(precision=precision, cache=self.cache)
+            )
+        return len(model.calls)
+
+    def test_effective_precision_is_part_of_the_key(self):
+        """
+        Embeddings cached at one effective precision are not reused at another.
+        """
+        self.assertEqual(self._encode_calls("cuda"), 1)
+        self.assertEqual(self._encode_calls("cuda", "fp16"), 0, "CUDA defaults to fp16.")
+        self.assertEqual(self._encode_calls("cuda", "fp32"), 1, "Expected a cache miss for fp32 on CUDA.")
+        self.assertEqual(self._encode_calls("cpu"), 0, "CPU runs fp32, like fp32 on CUDA.")
+
+    def test_cpu_precisions_share_fp32_entries(self):
+        """
+        On CPU the model always runs in fp32, whatever precision is requested.
+        """
+        self.assertEqual(self._encode_calls("cpu"), 1)
+        self.assertEqual(self._encode_calls("cpu", "fp16"), 0)
+        self.assertEqual(self._encode_calls("cpu", "bf16"), 0)
+        self.assertEqual(self._encode_calls("cuda"), 1, "Expected a cache miss for fp16 on CUDA.")
+
+
+class TestPairs(unittest.TestCase):
+    """
+    Batch mode reads tab-separated pairs and compares them in worker processes.
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_a = _write_json(self.tmp_dir.name, "a.json", '{"a": 1}')
+        self.file_b = _write_json(self.tmp_dir.name, "b.json", '{"a": 2}')
+        self.file_c = _write_json(self.tmp_dir.name, "c.json", '{"a": 1, "b": 3}')
+
+    def _run_main(self, *argv):
+        """
+        Run main with `argv` and return the exit code and stderr of a usage error.
+        """
+        stderr = io.StringIO()
+        with mock.patch("sys.argv", ["compare.py", *argv]), contextlib.redirect_stderr(stderr), \
+                self.assertRaises(SystemExit) as context:
+            main()
+        return context.exception.code, stderr.getvalue()
+
+    def test_read_pairs_skips_blank_lines(self):
+        """
+        Each non-blank line holds one pair; blank lines are ignored.
+        """
+        pairs_path = _write_json(self.tmp_dir.name, "pairs.tsv", "a.json\tb.json\n\n  \nb.json\tc.json\r\n")
+        self.assertEqual(_read_pairs(pairs_path), [("a.json", "b.json"), ("b.json", "c.json")])
+
+    def test_read_pairs_rejects_wrong_column_count(self):
+        """
+        Lines without exactly two tab-separated paths raise ValueError naming the line.
+        """
+        pairs_path = _write_json(self.tmp_dir.name, "pairs.tsv", "a.json\tb.json\na.json\tb.json\tc.json\n")
+        with self.assertRaisesRegex(ValueError, ":2: expected two tab-separated paths"):
+            _read_pairs(pairs_path)
+
+    def test_compare_pairs_keeps_input_order(self):
+        """
+        Results line up with the input pairs; structural-only pairs never load the model.
+        """
+        pairs = [(self.file_a, self.file_b), (self.file_a, self.file_a), (self.file_a, self.file_c)]
+        results = compare_pairs(pairs, workers=2)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(list(results[0]["structural_diff"]), ["values_changed"])
+        self.assertEqual(results[1]["structural_diff"], {})
+        self.assertEqual(list(results[2]["structural_diff"]), ["dictionary_item_added"])
+
+    def test_usage_errors(self):
+        """
+        Invalid argument combinations exit through the argument parser.
+        """
+        pairs_path = _write_json(self.tmp_dir.name, "pairs.tsv", f"{self.file_a}\t{self.file_b}\n")
+        bad_pairs_path = _write_json(self.tmp_dir.name, "bad.tsv", "a.json\n")
+        cases = [
+            ((self.file_a,), "json1 and json2 are required"),
+            (("--pairs", pairs_path, "--threads", "2"), "--threads cannot be used with --pairs"),
+            (("--pairs", pairs_path, "--workers", "0"), "--workers must be at least 1"),
+            (("--pairs", bad_pairs_path), "expected two tab-separated paths"),
+        ]
+        for argv, message in cases:
+            with self.subTest(argv=argv):
+                code, stderr = self._run_main(*argv)
+                self.assertEqual(code, 2)
+                self.assertIn(message, stderr)
+
+
 if __name__ == "__main__":
     unittest.main()